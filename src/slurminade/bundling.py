@@ -2,9 +2,12 @@
 Contains code for bundling function calls together.
 """
 
+import atexit
 import logging
 import typing
+import weakref
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from .dispatcher import (
@@ -19,6 +22,8 @@ from .options import SlurmOptions
 
 
 class BundlingJobReference(JobReference):
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__()
 
@@ -32,6 +37,10 @@ class BundlingJobReference(JobReference):
         return {}
 
 
+# Stateless, so all buffered tasks can share one reference.
+_BUNDLING_JOB_REFERENCE = BundlingJobReference()
+
+
 class TaskBuffer:
     """
     A simple container to buffer all the tasks by their options.
@@ -40,18 +49,66 @@ class TaskBuffer:
 
     def __init__(self):
         self._tasks = defaultdict(list)
+        # Consecutive tasks usually come with the same options, often even the
+        # same object. Then we can skip hashing the options and the lookup.
+        self._last_options: typing.Optional[SlurmOptions] = None
+        self._last_entry_point: typing.Optional[Path] = None
+        self._last_tasks: typing.List[FunctionCall] = []
+
+    def _is_last_group(self, options: SlurmOptions, entry_point: Path) -> bool:
+        # Usually the very same Path object, see `get_entry_point`.
+        if entry_point is not self._last_entry_point and (
+            entry_point != self._last_entry_point
+        ):
+            return False
+        # Comparing the items is cheaper than hashing a new options object,
+        # as created by `wait_for` for every call.
+        return options is self._last_options or dict.__eq__(options, self._last_options)
 
     def add(self, task: FunctionCall, options: SlurmOptions, entry_point: Path) -> int:
-        self._tasks[(entry_point, options)].append(task)
-        return len(self._tasks[(entry_point, options)])
+        if not self._is_last_group(options, entry_point):
+            self._last_tasks = self._tasks[(entry_point, options)]
+            self._last_options = options
+            self._last_entry_point = entry_point
+        self._last_tasks.append(task)
+        return len(self._last_tasks)
 
     def items(self):
         for (entry_point, opt), tasks in self._tasks.items():
             if tasks:
                 yield entry_point, opt, tasks
 
+    def __len__(self) -> int:
+        return sum(len(tasks) for tasks in self._tasks.values())
+
     def clear(self):
         self._tasks.clear()
+        self._last_options = None
+        self._last_entry_point = None
+        self._last_tasks = []
+
+
+# Bundlings that may still hold tasks, i.e., not (yet) used as a context.
+# Weakly referenced, so the exit hook does not keep them alive.
+_unflushed_bundlings: "weakref.WeakSet[JobBundling]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    # In case a bundling is not used as context and never flushed.
+    for bundling in list(_unflushed_bundlings):
+        bundling.flush()
+
+
+def _warn_about_dropped_tasks(tasks: TaskBuffer) -> None:
+    # Only warns, as submitting during garbage collection is not safe.
+    if len(tasks):
+        logging.getLogger("slurminade").warning(
+            "A JobBundling has been garbage collected without a flush."
+            " Its %d buffered tasks have not been distributed."
+            " Use the bundling as a context or call `flush`.",
+            len(tasks),
+        )
 
 
 class JobBundling(Dispatcher):
@@ -66,17 +123,35 @@ class JobBundling(Dispatcher):
                 f.distribute(i)
 
     to automatically bundle up to 20 tasks and distribute them.
+    On slurm, all bundles with the same options are submitted together as a job
+    array, such that even ``max_size=1`` only needs a single ``sbatch`` per
+    ``max_array_size`` bundles of the ``SlurmDispatcher``.
     """
 
-    def __init__(self, max_size: int):
+    # Only the dispatches of the subdispatcher count.
+    _counts_dispatches = False
+
+    def __init__(
+        self, max_size: int, deduplicate: bool = False, parallel_submit: bool = True
+    ):
         """
         :param max_size: Bundle up to this many calls.
+        :param deduplicate: Only execute one of multiple identical calls (same
+            function, arguments, and options). Only use this for functions without
+            side effects beyond their result, as repetitions are dropped.
+        :param parallel_submit: Submit the tasks of different options concurrently
+            if the underlying dispatcher is not sequential (e.g., slurm).
         """
         super().__init__()
         self.max_size = max_size
+        self.deduplicate = deduplicate
+        self.parallel_submit = parallel_submit
         self.subdispatcher = get_dispatcher()
         self._tasks = TaskBuffer()
         self._all_job_refs = []
+        _unflushed_bundlings.add(self)
+        # Bundlings still alive at exit are flushed by `_flush_at_exit` instead.
+        weakref.finalize(self, _warn_about_dropped_tasks, self._tasks).atexit = False
 
     def flush(self) -> typing.List[JobReference]:
         """
@@ -87,17 +162,61 @@ class JobBundling(Dispatcher):
         :param options: Only flush tasks with specific options.
         :return: A list of job references.
         """
-        job_refs = []
+        groups = []
         for entry_point, opt, tasks_ in self._tasks.items():
-            tasks = tasks_
-            while tasks:
-                job_ref = self.subdispatcher(tasks[: self.max_size], opt, entry_point)
-                job_refs.append(job_ref)
-                tasks = tasks[self.max_size :]
+            tasks = self._deduplicate(tasks_) if self.deduplicate else tasks_
+            bundles = [
+                tasks[i : i + self.max_size]
+                for i in range(0, len(tasks), self.max_size)
+            ]
+            groups.append((bundles, opt, entry_point))
+        job_refs = []
+        for group_job_refs in self._submit(groups):
+            job_refs += group_job_refs
         self._tasks.clear()
         self._all_job_refs.extend(job_refs)
         return job_refs
 
+    def _submit(
+        self,
+        groups: typing.List[
+            typing.Tuple[typing.List[typing.List[FunctionCall]], SlurmOptions, Path]
+        ],
+    ) -> typing.List[typing.List[JobReference]]:
+        def submit(group):
+            return self.subdispatcher.dispatch_bundles(*group)
+
+        if (
+            self.parallel_submit
+            and len(groups) > 1
+            and not self.subdispatcher.is_sequential()
+        ):
+            # Every submission waits for slurm, so we do not need more threads.
+            with ThreadPoolExecutor(max_workers=min(8, len(groups))) as executor:
+                futures = []
+                for group in groups:
+                    try:
+                        futures.append(executor.submit(submit, group))
+                    except RuntimeError:
+                        # No new threads after interpreter shutdown, e.g.,
+                        # when flushing at exit. Submit the rest sequentially.
+                        break
+                job_refs = [future.result() for future in futures]
+            return job_refs + [submit(group) for group in groups[len(futures) :]]
+        return [submit(group) for group in groups]
+
+    def _deduplicate(
+        self, tasks: typing.List[FunctionCall]
+    ) -> typing.List[FunctionCall]:
+        unique = {}
+        for task in tasks:
+            unique.setdefault(task.to_json_string(), task)
+        if len(unique) < len(tasks):
+            logging.getLogger("slurminade").info(
+                f"Skipping {len(tasks) - len(unique)} duplicate function calls."
+            )
+        return list(unique.values())
+
     def get_all_job_ids(self) -> typing.List[int]:
         """
         Return all job ids that have been used.
@@ -116,8 +235,8 @@ class JobBundling(Dispatcher):
         :param kwargs: The keywords arguments.
         :return: None
         """
-        self._dispatch(
-            [FunctionCall(func.func_id, args, kwargs)],
+        self._tasks.add(
+            FunctionCall(func.func_id, args, kwargs),
             func.special_slurm_opts,
             func.get_entry_point(),
         )
@@ -131,10 +250,10 @@ class JobBundling(Dispatcher):
     ) -> JobReference:
         if block:
             # if blocking, we don't buffer, but dispatch immediately
-            return self.subdispatcher._dispatch(funcs, options, entry_point, block=True)
+            return self.subdispatcher(funcs, options, entry_point, block=True)
         for func in funcs:
             self._tasks.add(func, options, entry_point)
-        return BundlingJobReference()
+        return _BUNDLING_JOB_REFERENCE
 
     def srun(
         self,
@@ -160,6 +279,7 @@ class JobBundling(Dispatcher):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        _unflushed_bundlings.discard(self)
         if exc_type:
             logging.getLogger("slurminade").error("Aborted due to exception.")
             return
@@ -167,6 +287,8 @@ class JobBundling(Dispatcher):
         set_dispatcher(self.subdispatcher)
 
     def _log_dispatch(self, funcs: typing.List[FunctionCall], options: SlurmOptions):
+        if not logging.getLogger("slurminade").isEnabledFor(logging.INFO):
+            return  # avoid building the message
         if len(funcs) == 1:
             logging.getLogger("slurminade").info(
                 f"Adding task to batch with options {options}: {funcs[0]}"
@@ -176,9 +298,6 @@ class JobBundling(Dispatcher):
                 f"Adding {len(funcs)} tasks to batch with options {options}: {', '.join([str(f) for f in funcs])}"
             )
 
-    def __del__(self):
-        self.flush()
-
     def join(self):
         self.flush()
         return self.subdispatcher.join()
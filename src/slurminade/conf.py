@@ -2,24 +2,26 @@
 This file saves the default configuration for slurm.
 """
 
-import json
 import logging
 import os.path
 import typing
 from pathlib import Path
 
+from .function_call import _loads
+
 CONFIG_NAME = ".slurminade_default.json"
 
-__default_conf: typing.Dict = {}
+# Loaded lazily from the configuration files on first use, see `_get_default_conf`.
+__default_conf: typing.Optional[typing.Dict] = None
 
 
 def _load_conf(path: Path):
     try:
-        if path.is_file():
-            with path.open() as f:
-                return json.load(f)
-        else:
-            return {}
+        # Opened without checking `is_file` first, as every stat can be a
+        # round trip to a networked home directory.
+        return _loads(path.read_bytes())
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return {}
     except Exception as e:
         logging.getLogger("slurminade").error(
             f"slurminade could not open default configuration {path}!\n{e!s}"
@@ -33,10 +35,24 @@ def update_default_configuration(conf=None, **kwargs):
     :param conf: A dictionary with the configuration.
     :param kwargs: Configuration parameters. (alternative to giving a dictionary)
     """
+    default_conf = _get_default_conf()
     if conf:
-        __default_conf.update(conf)
+        default_conf.update(conf)
     if kwargs:
-        __default_conf.update(kwargs)
+        default_conf.update(kwargs)
+
+
+def _get_default_conf() -> typing.Dict:
+    """
+    Returns the default configuration, loading it from the configuration files
+    on first access. Changes made via `update_default_configuration` take
+    precedence over the files.
+    """
+    global __default_conf  # noqa: PLW0603
+    if __default_conf is None:
+        __default_conf = {}
+        _load_default_conf()
+    return __default_conf
 
 
 def _load_default_conf():
@@ -48,9 +64,6 @@ def _load_default_conf():
     update_default_configuration(_load_conf(Path(CONFIG_NAME)))
 
 
-_load_default_conf()
-
-
 def set_default_configuration(conf=None, **kwargs):
     """
     Replaces the default configuration.
@@ -58,12 +71,13 @@ def set_default_configuration(conf=None, **kwargs):
     :param conf: A dictionary with the configuration.
     :param kwargs: Configuration parameters. (alternative to giving a dictionary)
     """
+    global __default_conf  # noqa: PLW0603
     __default_conf = {}
     update_default_configuration(conf, **kwargs)
 
 
 def _get_conf(conf=None):
     conf = conf if conf else {}
-    conf_ = __default_conf.copy()
+    conf_ = _get_default_conf().copy()
     conf_.update(conf)
     return conf_
@@ -6,27 +6,43 @@ Batch simply wraps the dispatcher by a buffered version.
 """
 
 import abc
+import copy
+import functools
 import logging
 import os
 import shlex
 import shutil
 import subprocess
 import typing
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 import simple_slurm
 
 from .conf import _get_conf
-from .execute_cmds import create_slurminade_command
+from .execute_cmds import (
+    SlurminadeWorker,
+    _new_array_prefix,
+    create_slurminade_args,
+    create_slurminade_array_command,
+    create_slurminade_command,
+    create_slurminade_here_document_command,
+    get_local_temp_dir,
+    remove_array_files,
+)
 from .function_call import FunctionCall
-from .function_map import FunctionMap, get_entry_point
+from .function_map import FunctionMap
 from .guard import dispatch_guard
 from .job_reference import JobReference
 from .options import SlurmOptions
 
 # MAX_ARG_STRLEN on a Linux system with PAGE_SIZE 4096 is 131072
 DEFAULT_MAX_ARG_LENGTH = 100000
+# Slurm's default MaxArraySize of 1001 allows array indices up to 1000.
+DEFAULT_MAX_ARRAY_SIZE = 1000
+# Number of configurations for which simple_slurm objects are cached.
+SLURM_API_CACHE_SIZE = 64
 
 
 class Dispatcher(abc.ABC):
@@ -36,6 +52,10 @@ class Dispatcher(abc.ABC):
 
     """
 
+    # Whether a call counts towards the dispatch limit. `_dispatch` itself does
+    # not need to check the limit.
+    _counts_dispatches = True
+
     @abc.abstractmethod
     def _dispatch(
         self,
@@ -84,6 +104,8 @@ class Dispatcher(abc.ABC):
         """
 
     def _log_dispatch(self, funcs: typing.List[FunctionCall], options: SlurmOptions):
+        if not logging.getLogger("slurminade").isEnabledFor(logging.INFO):
+            return  # avoid building the message
         if len(funcs) == 1:
             logging.getLogger("slurminade").info(
                 f"Dispatching task with options {options}: {funcs[0]}"
@@ -108,10 +130,29 @@ class Dispatcher(abc.ABC):
         """
         if isinstance(funcs, FunctionCall):
             funcs = [funcs]
-        funcs = list(funcs)
+        elif not isinstance(funcs, list):
+            funcs = list(funcs)
         self._log_dispatch(funcs, options)
+        if self._counts_dispatches:
+            dispatch_guard()
         return self._dispatch(funcs, options, entry_point, block)
 
+    def dispatch_bundles(
+        self,
+        bundles: typing.Sequence[typing.Iterable[FunctionCall]],
+        options: SlurmOptions,
+        entry_point: Path,
+    ) -> typing.List[JobReference]:
+        """
+        Dispatches multiple bundles of function calls with the same options.
+        Every bundle is dispatched as a job of its own. Dispatchers that can
+        submit the bundles together (e.g., as a slurm job array) should override this.
+        :param bundles: The bundles of function calls.
+        :param options: The slurm options to be used.
+        :return: The job references.
+        """
+        return [self(bundle, options, entry_point) for bundle in bundles]
+
     def is_sequential(self):
         """
         Return true if the dispatcher works sequential. In this case, the dependencies
@@ -132,6 +173,8 @@ class Dispatcher(abc.ABC):
 
 
 class TestJobReference(JobReference):
+    __slots__ = ()
+
     def get_job_id(self) -> None:
         return None
 
@@ -158,14 +201,12 @@ class TestDispatcher(Dispatcher):
         self,
         funcs: typing.Iterable[FunctionCall],
         options: SlurmOptions,  # noqa: ARG002
-        entry_point: Path,  # noqa: ARG002
+        entry_point: Path,
         block: bool = False,  # noqa: ARG002
     ) -> JobReference:
-        dispatch_guard()
-        funcs = list(funcs)
-        command = create_slurminade_command(
-            get_entry_point(), funcs, self.max_arg_length
-        )
+        if not isinstance(funcs, list):
+            funcs = list(funcs)
+        command = create_slurminade_command(entry_point, funcs, self.max_arg_length)
         logging.getLogger("slurminade").info(command)
         self.calls.append(funcs)
         self._cleanup(command)
@@ -173,7 +214,7 @@ class TestDispatcher(Dispatcher):
 
     def _cleanup(self, command):
         args = shlex.split(command)
-        if args[-2] != "temp":
+        if args[-2] != "--fromfile":
             return
         filename = Path(args[-1])
         if filename.exists():
@@ -206,6 +247,8 @@ class TestDispatcher(Dispatcher):
 
 
 class SlurmJobReference(JobReference):
+    __slots__ = ("job_id", "exit_code", "mode")
+
     def __init__(self, job_id, exit_code, mode: str):
         self.job_id = job_id
         self.exit_code = exit_code
@@ -219,30 +262,132 @@ class SlurmJobReference(JobReference):
 
     def get_info(self) -> Dict[str, Any]:
         return {
-            "job_id": self.job_id,
-            "exit_code": self.exit_code,
+            "job_id": self.get_job_id(),
+            "exit_code": self.get_exit_code(),
             "on_slurm": True,
             "mode": self.mode,
         }
 
 
+class AsyncSlurmJobReference(SlurmJobReference):
+    """
+    A job whose `sbatch` may still be running. Its job id is only waited for
+    when it is requested, e.g., for a dependency.
+    """
+
+    __slots__ = ("_future",)
+
+    def __init__(self, future: "Future[int]"):
+        super().__init__(None, None, "sbatch")
+        self._future = future
+
+    def get_job_id(self) -> int:
+        return self._future.result()
+
+
+@functools.lru_cache(maxsize=1)
+def _which_sbatch() -> typing.Optional[str]:
+    # Searching the PATH is only done once per process.
+    return shutil.which("sbatch")
+
+
+def _is_slurm_available() -> bool:
+    return _which_sbatch() is not None
+
+
+def _sbatch_from_stdin(slurm: simple_slurm.Slurm, command: str) -> int:
+    """
+    Submits the command like `simple_slurm.Slurm.sbatch`, but passes the script
+    to `sbatch` via stdin. `simple_slurm` puts it into a shell argument, which
+    limits its length and substitutes variables in it, and spawns a shell
+    in addition to `sbatch` for every submission.
+    """
+    slurm.add_cmd(command)
+    result = subprocess.run(
+        [_which_sbatch() or "sbatch", "--parsable"],
+        input=slurm.script(convert=False),
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        msg = f"sbatch failed: {result.stderr}"
+        raise RuntimeError(msg)
+    # The output is `job_id[;cluster]`.
+    job_id = int(result.stdout.strip().split(";")[0])
+    logging.getLogger("slurminade").debug("Submitted batch job %s", job_id)
+    return job_id
+
+
+def _sbatch_array_from_stdin(
+    slurm: simple_slurm.Slurm, command: str, prefix: str
+) -> int:
+    """
+    Submits a job array like `_sbatch_from_stdin`. If the submission fails,
+    no array task will delete the bundle files, so they are removed here.
+    """
+    try:
+        return _sbatch_from_stdin(slurm, command)
+    except BaseException:
+        remove_array_files(prefix)
+        raise
+
+
 class SlurmDispatcher(Dispatcher):
     """
     The most important dispatcher: Distributing function calls to slurm.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        asynchronous: bool = False,
+        max_parallel_submissions: int = 16,
+        max_array_size: int = DEFAULT_MAX_ARRAY_SIZE,
+    ):
+        """
+        :param asynchronous: Do not wait for `sbatch` to return but submit in the
+            background. The job ids are only waited for when needed, e.g., by
+            `wait_for` or `join`. Failed submissions are logged.
+        :param max_parallel_submissions: The number of concurrent `sbatch` calls
+            when submitting asynchronously.
+        :param max_array_size: The maximal number of tasks of a job array. More
+            bundles are split into multiple arrays. Has to be below the
+            `MaxArraySize` of your slurm configuration.
+        """
         super().__init__()
-        if not shutil.which("sbatch"):
+        if not _is_slurm_available():
             msg = "Slurm could not be found."
             raise RuntimeError(msg)
         self.max_arg_length = DEFAULT_MAX_ARG_LENGTH
+        self.max_array_size = max_array_size
         self._all_job_ids = []
         self._join_dependencies = []
+        self._executor = (
+            ThreadPoolExecutor(max_workers=max_parallel_submissions)
+            if asynchronous
+            else None
+        )
+        self._pending_submissions: typing.List[Future[int]] = []
+        self._slurm_api_cache: typing.Dict[SlurmOptions, simple_slurm.Slurm] = {}
 
-    def _create_slurm_api(self, special_slurm_opts):
-        conf = _get_conf(special_slurm_opts)
-        return simple_slurm.Slurm(**conf)
+    def _create_slurm_api(self, special_slurm_opts) -> simple_slurm.Slurm:
+        """
+        Creating a simple_slurm object is expensive, so we keep one per
+        configuration and hand out copies, as the commands are stored in the object.
+        """
+        conf = SlurmOptions(_get_conf(special_slurm_opts))
+        try:
+            slurm = self._slurm_api_cache.get(conf)
+        except TypeError:  # unhashable option values, e.g., lists
+            return simple_slurm.Slurm(**conf)
+        if slurm is None:
+            if len(self._slurm_api_cache) >= SLURM_API_CACHE_SIZE:
+                self._slurm_api_cache.clear()
+            slurm = simple_slurm.Slurm(**conf)
+            self._slurm_api_cache[conf] = slurm
+        slurm = copy.copy(slurm)
+        slurm.reset_cmd()
+        return slurm
 
     def _job_name(self, funcs: typing.List[FunctionCall]) -> str:
         func_names = list({FunctionMap.get_readable_name(f.func_id) for f in funcs})
@@ -250,6 +395,18 @@ class SlurmDispatcher(Dispatcher):
             return f"slurminade:{func_names[0]}"
         return f"slurminade[batch]:{func_names[0]}..."
 
+    def _prepare_options(
+        self, funcs: typing.List[FunctionCall], options: SlurmOptions
+    ) -> SlurmOptions:
+        if "job_name" not in options:
+            # This is complicated to prevent warnings about the type
+            options = SlurmOptions(**options.as_dict())
+            options["job_name"] = self._job_name(funcs)
+        options = SlurmOptions(**options)
+        if self._join_dependencies:
+            options.add_dependencies(self._join_dependencies, "afterany")
+        return options
+
     def _dispatch(
         self,
         funcs: typing.Iterable[FunctionCall],
@@ -257,17 +414,18 @@ class SlurmDispatcher(Dispatcher):
         entry_point: Path,
         block: bool = False,
     ) -> SlurmJobReference:
-        dispatch_guard()
-        if "job_name" not in options:
+        if not isinstance(funcs, list):
             funcs = list(funcs)
-            # This is complicated to prevent warnings about the type
-            options = SlurmOptions(**options.as_dict())
-            options["job_name"] = self._job_name(funcs)
-        options = SlurmOptions(**options)
-        if self._join_dependencies:
-            options.add_dependencies(self._join_dependencies, "afterany")
+        options = self._prepare_options(funcs, options)
         slurm = self._create_slurm_api(options)
-        command = create_slurminade_command(entry_point, funcs, self.max_arg_length)
+        command = None
+        if not block:
+            # Long calls are stored in the batch script instead of a temporary file.
+            command = create_slurminade_here_document_command(
+                entry_point, funcs, self.max_arg_length
+            )
+        if command is None:
+            command = create_slurminade_command(entry_point, funcs, self.max_arg_length)
         logging.getLogger("slurminade").debug(command)
         if block:
             ret = slurm.srun(command)
@@ -275,10 +433,79 @@ class SlurmDispatcher(Dispatcher):
                 "Returned from srun with exit code %s", ret
             )
             return SlurmJobReference(None, ret, "srun")
-        jid = slurm.sbatch(command)
+        return self._sbatch(functools.partial(_sbatch_from_stdin, slurm, command))
+
+    def _sbatch(self, submit: typing.Callable[[], int]) -> SlurmJobReference:
+        """
+        Runs the submission, which returns the job id, in the background
+        if asynchronous.
+        """
+        if self._executor is not None:
+            try:
+                future = self._executor.submit(submit)
+            except RuntimeError:
+                future = None  # shut down, as in `JobBundling._submit`
+            if future is not None:
+                future.add_done_callback(self._log_failed_submission)
+                self._pending_submissions.append(future)
+                return AsyncSlurmJobReference(future)
+        jid = submit()
         self._all_job_ids.append(jid)
         return SlurmJobReference(jid, None, "sbatch")
 
+    @staticmethod
+    def _log_failed_submission(future: "Future[int]") -> None:
+        if future.exception() is not None:
+            logging.getLogger("slurminade").error(
+                "Submission to slurm failed: %s", future.exception()
+            )
+
+    def dispatch_bundles(
+        self,
+        bundles: typing.Sequence[typing.Iterable[FunctionCall]],
+        options: SlurmOptions,
+        entry_point: Path,
+    ) -> typing.List[JobReference]:
+        """
+        Submits the bundles with a single `sbatch` as a job array, with one
+        array task per bundle. More than `max_array_size` bundles are split into
+        multiple arrays. A reference is returned per array job, such that
+        dependencies wait for all of its tasks.
+        """
+        bundles = [list(bundle) for bundle in bundles]
+        if len(bundles) <= 1 or "array" in options:
+            return super().dispatch_bundles(bundles, options, entry_point)
+        dispatch_guard(len(bundles))
+        return [
+            self._dispatch_array(
+                bundles[i : i + self.max_array_size], options, entry_point
+            )
+            for i in range(0, len(bundles), self.max_array_size)
+        ]
+
+    def _dispatch_array(
+        self,
+        bundles: typing.List[typing.List[FunctionCall]],
+        options: SlurmOptions,
+        entry_point: Path,
+    ) -> JobReference:
+        funcs = [func for bundle in bundles for func in bundle]
+        logging.getLogger("slurminade").info(
+            "Dispatching job array of %d tasks consisting of %d function calls with options %s",
+            len(bundles),
+            len(funcs),
+            options,
+        )
+        options = self._prepare_options(funcs, options)
+        options["array"] = f"0-{len(bundles) - 1}"
+        slurm = self._create_slurm_api(options)
+        prefix = _new_array_prefix()
+        command = create_slurminade_array_command(entry_point, bundles, prefix)
+        logging.getLogger("slurminade").debug(command)
+        return self._sbatch(
+            functools.partial(_sbatch_array_from_stdin, slurm, command, prefix)
+        )
+
     def sbatch(
         self,
         command: str,
@@ -286,17 +513,16 @@ class SlurmDispatcher(Dispatcher):
         simple_slurm_kwargs: typing.Optional[typing.Dict] = None,
     ) -> SlurmJobReference:
         dispatch_guard()
-        conf = _get_conf(conf)
-        slurm = simple_slurm.Slurm(**conf)
+        slurm = self._create_slurm_api(conf)
         logging.getLogger("slurminade").debug("SBATCH %s", command)
-        if simple_slurm_kwargs:
-            jid = slurm.sbatch(command, **simple_slurm_kwargs)
-        else:
-            jid = slurm.sbatch(command)
-        self._all_job_ids.append(jid)
-        return SlurmJobReference(jid, None, "sbatch")
+        return self._sbatch(
+            functools.partial(slurm.sbatch, command, **(simple_slurm_kwargs or {}))
+        )
 
     def join(self):
+        # Wait for background submissions, as we need their job ids.
+        self._all_job_ids += [future.result() for future in self._pending_submissions]
+        self._pending_submissions = []
         if not self._all_job_ids:
             return
         self._join_dependencies = list(set(self._all_job_ids))
@@ -308,17 +534,43 @@ class SlurmDispatcher(Dispatcher):
         simple_slurm_kwargs: typing.Optional[typing.Dict] = None,
     ) -> SlurmJobReference:
         dispatch_guard()
-        conf = _get_conf(conf)
-        slurm = simple_slurm.Slurm(**conf)
+        slurm = self._create_slurm_api(conf)
         logging.getLogger("slurminade").debug("SRUN %s", command)
-        if simple_slurm_kwargs:
-            ret = slurm.srun(command, **simple_slurm_kwargs)
-        else:
-            ret = slurm.srun(command)
+        ret = slurm.srun(command, **(simple_slurm_kwargs or {}))
         return SlurmJobReference(None, ret, "srun")
 
 
+def _run_locally(command: str) -> None:
+    """
+    The `srun` and `sbatch` of the dispatchers without slurm.
+    """
+    dispatch_guard()
+    logging.getLogger("slurminade").debug("SRUN %s", command)
+    # Like on slurm, the command is run by a shell.
+    returncode = _spawn_and_wait(["/bin/sh", "-c", command])
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command)
+
+
+def _spawn_and_wait(args: typing.List[str]) -> int:
+    """
+    Runs a command without a shell and waits for it.
+    `posix_spawn` avoids the overhead of `subprocess` where available.
+    :param args: The program and its arguments.
+    :return: The exit code, negative if terminated by a signal.
+    """
+    if not hasattr(os, "posix_spawnp"):
+        return subprocess.run(args, check=False).returncode
+    pid = os.posix_spawnp(args[0], args, os.environ)
+    _, status = os.waitpid(pid, 0)
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
 class SubprocessJobReference(JobReference):
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -341,9 +593,17 @@ class SubprocessDispatcher(Dispatcher):
     Despite using subprocesses, it does not parallelize but works sequential.
     """
 
-    def __init__(self):
+    def __init__(self, persistent_worker: bool = False):
+        """
+        :param persistent_worker: Execute all function calls of an entry point in a
+            single long-lived subprocess instead of starting a new one per dispatch.
+            Faster, but the calls are no longer isolated from each other and are not
+            passed via the command line as on slurm.
+        """
         super().__init__()
         self.max_arg_length = DEFAULT_MAX_ARG_LENGTH
+        self.persistent_worker = persistent_worker
+        self._workers: typing.Dict[Path, SlurminadeWorker] = {}
 
     def _dispatch(
         self,
@@ -352,9 +612,25 @@ class SubprocessDispatcher(Dispatcher):
         entry_point: Path,
         block: bool = False,  # noqa: ARG002
     ) -> int:
-        dispatch_guard()
-        command = create_slurminade_command(entry_point, funcs, self.max_arg_length)
-        os.system(command)
+        if self.persistent_worker:
+            worker = self._workers.get(entry_point)
+            if worker is not None and worker.terminated:  # e.g., killed while idle
+                worker.close()
+                worker = None
+            if worker is None:
+                worker = self._workers[entry_point] = SlurminadeWorker(entry_point)
+            exit_code = worker.execute(funcs)
+            if worker.terminated:
+                del self._workers[entry_point]  # restarted on demand
+        else:
+            args = create_slurminade_args(
+                entry_point, funcs, self.max_arg_length, get_local_temp_dir()
+            )
+            exit_code = _spawn_and_wait(args)
+        if exit_code:
+            logging.getLogger("slurminade").error(
+                "Function calls failed with exit code %s.", exit_code
+            )
         return -1
 
     def srun(
@@ -363,9 +639,8 @@ class SubprocessDispatcher(Dispatcher):
         conf: typing.Optional[typing.Dict] = None,  # noqa: ARG002
         simple_slurm_kwargs: typing.Optional[typing.Dict] = None,  # noqa: ARG002
     ):
-        dispatch_guard()
-        logging.getLogger("slurminade").debug("SRUN %s", command)
-        subprocess.run(command, check=True)
+        _run_locally(command)
+        return SubprocessJobReference()
 
     def sbatch(
         self,
@@ -373,13 +648,23 @@ class SubprocessDispatcher(Dispatcher):
         conf: typing.Optional[typing.Dict] = None,  # noqa: ARG002
         simple_slurm_kwargs: typing.Optional[typing.Dict] = None,  # noqa: ARG002
     ):
-        self.srun(command)
+        return self.srun(command)
+
+    def close(self) -> None:
+        """
+        Terminates the persistent workers. They are restarted on demand.
+        """
+        for worker in self._workers.values():
+            worker.close()
+        self._workers.clear()
 
     def is_sequential(self):
         return True
 
 
 class LocalJobReference(JobReference):
+    __slots__ = ()
+
     def get_job_id(self) -> None:
         return None
 
@@ -404,7 +689,6 @@ class DirectCallDispatcher(Dispatcher):
         entry_point: Path,  # noqa: ARG002
         block: bool = False,  # noqa: ARG002
     ) -> LocalJobReference:
-        dispatch_guard()
         for func in funcs:
             FunctionMap.call(func.func_id, func.args, func.kwargs)
         return LocalJobReference()
@@ -415,8 +699,7 @@ class DirectCallDispatcher(Dispatcher):
         conf: typing.Optional[typing.Dict] = None,  # noqa: ARG002
         simple_slurm_kwargs: typing.Optional[typing.Dict] = None,  # noqa: ARG002
     ):
-        dispatch_guard()
-        subprocess.run(command, check=True)
+        _run_locally(command)
         return LocalJobReference()
 
     def sbatch(
@@ -462,7 +745,6 @@ def set_dispatcher(dispatcher: Dispatcher) -> None:
     """
     global __dispatcher  # noqa: PLW0603
     __dispatcher = dispatcher
-    assert dispatcher == get_dispatcher()
 
 
 def dispatch(
@@ -477,12 +759,28 @@ def dispatch(
     :param options: The slurm options to be used.
     :return: The job id.
     """
-    funcs = list(funcs) if not isinstance(funcs, FunctionCall) else [funcs]
+    if isinstance(funcs, FunctionCall):
+        funcs = [funcs]
+    elif not isinstance(funcs, list):
+        funcs = list(funcs)
     for func in funcs:
         if not FunctionMap.check_id(func.func_id, entry_point):
             msg = f"Function '{func.func_id}' cannot be called from the given entry point."
             raise KeyError(msg)
-    return get_dispatcher()(funcs, options, entry_point, block)
+    # Skips the call of `get_dispatcher` once a dispatcher exists.
+    dispatcher = __dispatcher
+    if dispatcher is None:
+        dispatcher = get_dispatcher()
+    return dispatcher(funcs, options, entry_point, block)
+
+
+def _as_slurm_options(
+    conf: typing.Union[SlurmOptions, typing.Dict, None]
+) -> SlurmOptions:
+    if type(conf) is SlurmOptions:
+        return conf
+    # The dispatchers may modify the options, so a dict is always copied.
+    return SlurmOptions(conf) if conf else SlurmOptions()
 
 
 def srun(
@@ -498,15 +796,8 @@ def srun(
     :param simple_slurm_kwargs: Additional options for simple_slurm.
     :return: Job id
     """
-    if not isinstance(conf, SlurmOptions):
-        if conf is None:
-            conf = {}
-        conf = SlurmOptions(**conf)
-    command = (
-        command
-        if isinstance(command, str)
-        else " ".join(shlex.quote(c) for c in command)
-    )
+    conf = _as_slurm_options(conf)
+    command = command if isinstance(command, str) else shlex.join(command)
     return get_dispatcher().srun(command, conf, simple_slurm_kwargs)
 
 
@@ -522,15 +813,8 @@ def sbatch(
     :param simple_slurm_kwargs: Additional options for simple_slurm.
     :return: Job id.
     """
-    if not isinstance(conf, SlurmOptions):
-        if conf is None:
-            conf = {}
-        conf = SlurmOptions(**conf)
-    command = (
-        command
-        if isinstance(command, str)
-        else " ".join(shlex.quote(c) for c in command)
-    )
+    conf = _as_slurm_options(conf)
+    command = command if isinstance(command, str) else shlex.join(command)
     return get_dispatcher().sbatch(command, conf, simple_slurm_kwargs)
 
 
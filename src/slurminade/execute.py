@@ -3,17 +3,74 @@ This module provides the starting point for the slurm node. You do not have to c
 anything of this file yourself.
 """
 
+import gc
 import json
 import logging
+import os
+import sys
+from collections.abc import Iterator
+from importlib.machinery import SourceFileLoader
 from pathlib import Path
+from types import MappingProxyType
 
 import click
 
-from .function import SlurmFunction
+from .function_call import _loads
 from .function_map import FunctionMap, set_entry_point
 from .guard import prevent_distribution
 from .node_setup import disable_setup
 
+# Empty arguments are omitted in the calls. Read-only, as it is shared by all calls.
+_NO_KWARGS = MappingProxyType({})
+
+
+def _execute_calls(function_calls):
+    # Checked once for the whole batch, not for every call.
+    if not isinstance(function_calls, (list, Iterator)):
+        msg = "Expected a list of function calls."
+        raise ValueError(msg)
+    # Looked up directly instead of with `FunctionMap.call`, to save a call per call.
+    functions = FunctionMap._data
+    for fc in function_calls:
+        func = functions.get(fc["func_id"])
+        if func is None:
+            msg = f"Function '{fc['func_id']}' unknown!"
+            raise KeyError(msg)
+        func(*fc.get("args", ()), **fc.get("kwargs", _NO_KWARGS))
+
+
+def _read_calls(path: Path) -> Iterator:
+    """
+    Reads the function calls of a file one by one, so that the first call can be
+    executed before the whole file has been parsed. The file is deleted right
+    away; it can still be read while it is open.
+    """
+    with path.open("rb") as f:
+        path.unlink()
+        for line in f:
+            if line.startswith(b"["):  # all calls in a single list
+                yield from _loads(line + f.read())
+            elif line.strip():
+                yield _loads(line)
+
+
+def _serve(ack_fd: int):
+    """
+    Execute the function calls read line by line from stdin until it is closed.
+    Every line is acknowledged with "0" on success and "1" on failure.
+    """
+    with os.fdopen(ack_fd, "w") as ack:
+        for line in sys.stdin:
+            try:
+                _execute_calls(_loads(line))
+                status = "0"
+            except Exception:
+                logging.getLogger("slurminade").exception("Function call failed.")
+                status = "1"
+            sys.stdout.flush()
+            ack.write(status + "\n")
+            ack.flush()
+
 
 @click.command()
 @click.option(
@@ -29,6 +86,26 @@ from .node_setup import disable_setup
     help="The file to read the function calls from.",
     required=False,
 )
+@click.option(
+    "--fromstdin",
+    help="Read the function calls from stdin.",
+    default=False,
+    is_flag=True,
+    required=False,
+)
+@click.option(
+    "--fromarray",
+    type=str,
+    help="The file prefix of a job array. The file is selected by SLURM_ARRAY_TASK_ID.",
+    required=False,
+)
+@click.option(
+    "--server",
+    type=int,
+    help="Keep running and execute the function calls read line by line from stdin."
+    " Every line is acknowledged on the given file descriptor.",
+    required=False,
+)
 @click.option(
     "--listfuncs",
     help="List all available functions.",
@@ -36,40 +113,45 @@ from .node_setup import disable_setup
     is_flag=True,
     required=False,
 )
-def main(root, calls, fromfile, listfuncs):
+def main(root, calls, fromfile, fromstdin, fromarray, server, listfuncs):
     prevent_distribution()  # make sure, the code on the node does not distribute itself.
     if listfuncs:
         disable_setup()
     set_entry_point(root)
-    with Path(root).open() as f:
-        code = "".join(f.readlines())
+    # The loader reuses the bytecode in __pycache__ (as for an import of the file), so
+    # every job of the entry point after the first skips the compilation.
+    code = SourceFileLoader("__slurminade_entry_point__", root).get_code(None)
 
-    glob = dict(globals())
-    glob["__file__"] = root
-    glob["__name__"] = None
+    # A fresh namespace, such that the script does not see the names of this module.
+    # The name is not `__main__`, so the script does not distribute again.
+    glob = {"__name__": None, "__file__": root, "__builtins__": __builtins__}
     exec(code, glob)
+    # The modules loaded so far live until the end. Moving them out of the reach
+    # of the garbage collector keeps its runs during the calls short.
+    gc.freeze()
 
     if listfuncs:
         print(json.dumps(FunctionMap.get_all_ids()))  # noqa: T201
         return
+    if server is not None:
+        _serve(server)
+        return
+    if fromarray:
+        fromfile = f"{fromarray}_{os.environ['SLURM_ARRAY_TASK_ID']}.json"
     if calls:
-        function_calls = json.loads(calls)
+        function_calls = _loads(calls)
     elif fromfile:
-        with Path(fromfile).open() as f:
-            logging.getLogger("slurminade").info(
-                f"Reading function calls from {fromfile}."
-            )
-            function_calls = json.load(f)
-        Path(fromfile).unlink()
+        logging.getLogger("slurminade").info(
+            "Reading function calls from %s.", fromfile
+        )
+        function_calls = _read_calls(Path(fromfile))
+    elif fromstdin:
+        function_calls = _loads(sys.stdin.buffer.read())
     else:
         msg = "No function calls provided."
         raise ValueError(msg)
-    if not isinstance(function_calls, list):
-        msg = "Expected a list of function calls."
-        raise ValueError(msg)
     # Execute the functions
-    for fc in function_calls:
-        SlurmFunction.call(fc["func_id"], *fc.get("args", []), **fc.get("kwargs", {}))
+    _execute_calls(function_calls)
 
 
 if __name__ == "__main__":
@@ -2,19 +2,121 @@
 The commands that can be understood by execute.py
 """
 
+import contextlib
+import functools
 import json
 import logging
 import os
 import shlex
 import subprocess
 import sys
+import tempfile
 import typing
+import uuid
 from pathlib import Path
 from tempfile import mkstemp
 
 from .function_call import FunctionCall
 
 
+@functools.lru_cache(maxsize=32)
+def _check_entry_point(entry_point: Path) -> None:
+    # Only successful checks are cached, which saves a stat per command.
+    if not entry_point.exists():
+        msg = f"Entry point {entry_point} does not exist."
+        raise FileNotFoundError(msg)
+
+
+def _create_base_args(entry_point: Path) -> typing.List[str]:
+    return [sys.executable, "-m", "slurminade.execute", "--root", str(entry_point)]
+
+
+@functools.lru_cache(maxsize=32)
+def _create_base_command(entry_point: Path) -> str:
+    # Cached, as it is the same for all commands of an entry point.
+    return " ".join(shlex.quote(arg) for arg in _create_base_args(entry_point))
+
+
+def _serialize_calls(funcs: typing.Iterable[FunctionCall]) -> str:
+    # Joining the cached serializations avoids encoding every call again.
+    return "[" + ",".join(f.to_json_string() for f in funcs) + "]"
+
+
+def _write_calls(file: typing.TextIO, funcs: typing.Iterable[FunctionCall]) -> None:
+    # One call per line, such that the node can execute the calls while reading.
+    for func in funcs:
+        file.write(func.to_json_string())
+        file.write("\n")
+
+
+def _json_length(funcs: typing.List[FunctionCall]) -> int:
+    return sum(len(f.to_json_string()) + 1 for f in funcs) + 1
+
+
+def _quoted_length(serialized_calls: str) -> int:
+    # The length of `shlex.quote`, without quoting. JSON always contains `"`,
+    # so it is wrapped in single quotes and every `'` is replaced by `'"'"'`.
+    return len(serialized_calls) + 2 + 4 * serialized_calls.count("'")
+
+
+@functools.lru_cache(maxsize=1)
+def get_local_temp_dir() -> Path:
+    """
+    A directory for temporary files that are only read on this machine.
+    Prefers the memory-backed `/dev/shm`, as the working directory often is
+    on a network file system. Files for slurm jobs on other nodes must not
+    be placed here.
+    """
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return shm
+    return Path(tempfile.gettempdir())
+
+
+def _write_calls_to_temp_file(
+    funcs: typing.List[FunctionCall], temp_dir: typing.Optional[Path] = None
+) -> str:
+    # The path is absolute, as the job may run in a different directory.
+    fd, filename = mkstemp(
+        prefix="slurminade_",
+        suffix=".json",
+        text=True,
+        dir=temp_dir if temp_dir else Path.cwd(),
+    )
+    logging.getLogger("slurminade").info(
+        "Long function calls. Serializing function calls to temporary file %s",
+        filename,
+    )
+    with os.fdopen(fd, "w") as f:
+        _write_calls(f, funcs)
+    return filename
+
+
+def create_slurminade_args(
+    entry_point: Path,
+    funcs: typing.Iterable[FunctionCall],
+    max_arg_length: int,
+    temp_dir: typing.Optional[Path] = None,
+) -> typing.List[str]:
+    """
+    Like `create_slurminade_command`, but returns the arguments of the command for
+    running it without a shell. As no quoting is needed, the maximum length only
+    refers to the JSON of the function calls.
+    :param funcs: The function calls to be dispatched.
+    :param max_arg_length: The maximum allowed length of a command line argument.
+    :param temp_dir: The directory for a temporary file. Defaults to the working
+        directory.
+    :returns: The program and its arguments.
+    """
+    _check_entry_point(entry_point)
+    if not isinstance(funcs, list):
+        funcs = list(funcs)
+    if _json_length(funcs) > max_arg_length:
+        filename = _write_calls_to_temp_file(funcs, temp_dir)
+        return [*_create_base_args(entry_point), "--fromfile", filename]
+    return [*_create_base_args(entry_point), "--calls", _serialize_calls(funcs)]
+
+
 def create_slurminade_command(
     entry_point: Path, funcs: typing.Iterable[FunctionCall], max_arg_length: int
 ) -> str:
@@ -27,32 +129,102 @@ def create_slurminade_command(
     :param max_arg_length: The maximum allowed length of a command line argument.
     :returns: A string representing the command to be executed in the terminal.
     """
-    if not entry_point.exists():
-        msg = f"Entry point {entry_point} does not exist."
-        raise FileNotFoundError(msg)
-
-    command = (
-        f"{sys.executable} -m slurminade.execute --root {shlex.quote(str(entry_point))}"
-    )
+    _check_entry_point(entry_point)
+    command = _create_base_command(entry_point)
 
     # Serialize function calls as JSON
-    json_calls = json.dumps([f.to_json() for f in funcs])
-    serialized_calls = shlex.quote(json_calls)
+    if not isinstance(funcs, list):
+        funcs = list(funcs)
+    # Quoting never shortens the argument, so we only serialize if it may fit.
+    serialized_calls = (
+        _serialize_calls(funcs) if _json_length(funcs) <= max_arg_length else None
+    )
 
-    if len(serialized_calls) > max_arg_length:
+    if serialized_calls is None or _quoted_length(serialized_calls) > max_arg_length:
         # The argument is too long, create temporary file for the JSON
-        fd, filename = mkstemp(prefix="slurminade_", suffix=".json", text=True, dir=".")
-        logging.getLogger("slurminade").info(
-            f"Long function calls. Serializing function calls to temporary file {filename}"
-        )
-        with os.fdopen(fd, "w") as f:
-            f.write(json_calls)
-        command += f" --fromfile {filename}"
+        filename = _write_calls_to_temp_file(funcs)
+        command += f" --fromfile {shlex.quote(filename)}"
     else:
-        command += f" --calls {serialized_calls}"
+        command += f" --calls {shlex.quote(serialized_calls)}"
     return command
 
 
+# slurm rejects batch scripts larger than 4 MB by default (max_script_size).
+MAX_HERE_DOCUMENT_LENGTH = 3_000_000
+_HERE_DOCUMENT_DELIMITER = "SLURMINADE_CALLS"
+
+
+def create_slurminade_here_document_command(
+    entry_point: Path, funcs: typing.Iterable[FunctionCall], max_arg_length: int
+) -> typing.Optional[str]:
+    """
+    Creates a command for a batch script that passes function calls, which are too
+    long for a command line argument, via a here document to stdin. The calls are
+    then stored by slurm in the batch script instead of in a temporary file.
+    The JSON of the calls has no line breaks, so it cannot end the here document.
+    :param funcs: The function calls to be dispatched.
+    :param max_arg_length: The maximum allowed length of a command line argument.
+    :returns: The command, or None if the calls fit into an argument or are too
+        long for a batch script. Use `create_slurminade_command` in this case.
+    """
+    _check_entry_point(entry_point)
+    if not isinstance(funcs, list):
+        funcs = list(funcs)
+    if not max_arg_length < _json_length(funcs) <= MAX_HERE_DOCUMENT_LENGTH:
+        return None
+    return (
+        f"{_create_base_command(entry_point)} --fromstdin"
+        f" <<'{_HERE_DOCUMENT_DELIMITER}'\n"
+        f"{_serialize_calls(funcs)}\n{_HERE_DOCUMENT_DELIMITER}"
+    )
+
+
+def _new_array_prefix() -> str:
+    return str(Path.cwd() / f"slurminade_{uuid.uuid4().hex}")
+
+
+def remove_array_files(prefix: str) -> None:
+    """
+    Removes the bundle files `<prefix>_*.json` of a job array, e.g., if it could
+    not be submitted. Otherwise, every array task deletes its file itself.
+    :param prefix: The prefix used for `create_slurminade_array_command`.
+    """
+    prefix_ = Path(prefix)
+    for file in prefix_.parent.glob(f"{prefix_.name}_*.json"):
+        file.unlink(missing_ok=True)
+
+
+def create_slurminade_array_command(
+    entry_point: Path,
+    bundles: typing.Sequence[typing.Iterable[FunctionCall]],
+    prefix: typing.Optional[str] = None,
+) -> str:
+    """
+    Creates a terminal command for a slurm job array, in which every array task
+    executes one bundle of function calls. Each bundle is serialized to its own
+    file `<prefix>_<index>.json`, which the array task selects via the
+    `SLURM_ARRAY_TASK_ID` environment variable and deletes after reading.
+    :param entry_point: The entry point to reconstruct the functions from.
+    :param bundles: The bundles of function calls, one per array task.
+    :param prefix: The absolute path prefix of the files. A unique one by default.
+    :returns: A string representing the command to be executed by every array task.
+    """
+    _check_entry_point(entry_point)
+    if prefix is None:
+        prefix = _new_array_prefix()
+    try:
+        for i, bundle in enumerate(bundles):
+            with Path(f"{prefix}_{i}.json").open("w") as f:
+                _write_calls(f, bundle)
+    except BaseException:
+        remove_array_files(prefix)
+        raise
+    logging.getLogger("slurminade").info(
+        "Serialized %d bundles of function calls to %s_*.json", len(bundles), prefix
+    )
+    return _create_base_command(entry_point) + f" --fromarray {shlex.quote(prefix)}"
+
+
 def call_slurminade_to_get_function_ids(entry_point: Path) -> typing.Set[str]:
     cmd = [
         sys.executable,
@@ -66,3 +238,62 @@ def call_slurminade_to_get_function_ids(entry_point: Path) -> typing.Set[str]:
     out = out.strip().split("\n")[-1].strip()
     ids = json.loads(out)
     return set(ids)
+
+
+class SlurminadeWorker:
+    """
+    A long-lived subprocess that loads the entry point once and then executes
+    the function calls sent to it, avoiding the startup of a new Python
+    interpreter for every dispatch.
+    """
+
+    def __init__(self, entry_point: Path):
+        _check_entry_point(entry_point)
+        ack_read, ack_write = os.pipe()
+        cmd = [
+            sys.executable,
+            "-m",
+            "slurminade.execute",
+            "--root",
+            str(entry_point),
+            "--server",
+            str(ack_write),
+        ]
+        self._process = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, pass_fds=(ack_write,), text=True
+        )
+        os.close(ack_write)
+        self._ack = os.fdopen(ack_read)
+
+    def execute(self, funcs: typing.Iterable[FunctionCall]) -> int:
+        """
+        Executes the function calls and waits for them to finish.
+        If the worker terminates meanwhile, e.g., by `sys.exit` or a crash of a
+        call, it is closed and cannot be used anymore, see `terminated`.
+        :param funcs: The function calls to be executed.
+        :return: 0 if all calls succeeded, otherwise the exit code of the worker
+            or 1 if a call raised an exception.
+        """
+        assert self._process.stdin is not None
+        with contextlib.suppress(BrokenPipeError):  # detected by the missing ack
+            self._process.stdin.write(_serialize_calls(funcs) + "\n")
+            self._process.stdin.flush()
+        status = self._ack.readline().strip()
+        if not status:
+            self.close()
+            return self._process.returncode
+        return int(status)
+
+    @property
+    def terminated(self) -> bool:
+        return self._process.poll() is not None
+
+    def close(self) -> None:
+        """
+        Lets the worker finish and waits for it to terminate.
+        """
+        if self._process.stdin is not None:
+            with contextlib.suppress(BrokenPipeError):  # already terminated
+                self._process.stdin.close()
+        self._process.wait()
+        self._ack.close()
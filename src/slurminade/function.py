@@ -1,3 +1,4 @@
+import functools
 import inspect
 import logging
 import subprocess
@@ -22,6 +23,35 @@ class CallPolicy(Enum):
     DISTRIBUTED_BLOCKING = 2
 
 
+@functools.lru_cache(maxsize=256)
+def _get_signature(func: typing.Callable) -> inspect.Signature:
+    # Creating the signature is expensive, but it is checked on every distribution.
+    return inspect.signature(func)
+
+
+@functools.lru_cache(maxsize=256)
+def _get_positional_arity(
+    func: typing.Callable,
+) -> typing.Optional[typing.Tuple[int, int]]:
+    """
+    The minimal and maximal number of positional arguments, if the function only
+    has plain parameters. Calls with only positional arguments can then be checked
+    without binding them to the signature.
+    """
+    params = _get_signature(func).parameters.values()
+    plain = (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+    if any(p.kind not in plain for p in params):
+        return None
+    n_required = sum(1 for p in params if p.default is inspect.Parameter.empty)
+    return n_required, len(params)
+
+
+@functools.lru_cache(maxsize=256)
+def _get_defining_file(func: typing.Callable) -> Path:
+    # Needed for every new SlurmFunction, e.g., on every `wait_for`.
+    return Path(inspect.getfile(func))
+
+
 class SlurmFunction:
     """
     A wrapper around a function that allows it to be distributed to slurm.
@@ -39,6 +69,15 @@ class SlurmFunction:
 
     """
 
+    # Every `wait_for` and `with_options` creates a new instance.
+    __slots__ = (
+        "special_slurm_opts",
+        "func",
+        "func_id",
+        "call_policy",
+        "defining_file",
+    )
+
     def __init__(
         self,
         special_slurm_opts: typing.Dict,
@@ -46,11 +85,11 @@ class SlurmFunction:
         func_id: str,
         call_policy: CallPolicy = CallPolicy.LOCALLY,
     ):
-        self.special_slurm_opts = SlurmOptions(**special_slurm_opts)
+        self.special_slurm_opts = SlurmOptions(special_slurm_opts)
         self.func = func
         self.func_id = func_id
         self.call_policy = call_policy
-        self.defining_file = Path(inspect.getfile(func))
+        self.defining_file = _get_defining_file(func)
 
     def update_options(self, conf: typing.Dict[str, typing.Any]):
         self.special_slurm_opts.update(conf)
@@ -73,24 +112,21 @@ class SlurmFunction:
         :param method: 'after'|'afterany'|'afternotok'|'afterok'|'singleton'
         :return: Chainable slurm function object.
         """
-        sfunc = SlurmFunction(self.special_slurm_opts, self.func, self.func_id)
-        job_ids = (
+        job_refs = (
             [job_ids] if isinstance(job_ids, JobReference) else list(job_ids)
         )  # make sure it is a list
-        if not job_ids and not get_dispatcher().is_sequential():
+        if not job_refs and not get_dispatcher().is_sequential():
             msg = "Creating a dependency on an empty list of job ids."
             msg += " This is probably an error in your code."
             msg += " Maybe you are using `Batch` but flush outside of the `with` block?"
             raise RuntimeError(msg)
-        if (
-            any(jid.get_job_id() is None for jid in job_ids)
-            and not get_dispatcher().is_sequential()
-        ):
+        # Queried once, as it may wait for an asynchronous submission.
+        job_ids = [ref.get_job_id() for ref in job_refs]
+        if None in job_ids and not get_dispatcher().is_sequential():
             msg = "Invalid job id. Not every dispatcher can directly return job ids, because it may not directly distribute them or doesn't distribute them at all."
             raise RuntimeError(msg)
-        sfunc.special_slurm_opts.add_dependencies(
-            [jid.get_job_id() for jid in job_ids], method
-        )
+        sfunc = SlurmFunction(self.special_slurm_opts, self.func, self.func_id)
+        sfunc.special_slurm_opts.add_dependencies(job_ids, method)
         return sfunc
 
     def with_options(self, **kwargs) -> "SlurmFunction":
@@ -107,7 +143,11 @@ class SlurmFunction:
         """
         Check if the arguments match the function signature.
         """
-        inspect.signature(self.func).bind(*args, **kwargs)
+        if not kwargs:
+            arity = _get_positional_arity(self.func)
+            if arity is not None and arity[0] <= len(args) <= arity[1]:
+                return
+        _get_signature(self.func).bind(*args, **kwargs)
 
     def __call__(self, *args, **kwargs):
         """
@@ -155,6 +195,33 @@ class SlurmFunction:
             block=False,
         )
 
+    def distribute_many(
+        self, calls: typing.Iterable[typing.Tuple[typing.Sequence, typing.Dict]]
+    ) -> JobReference:
+        """
+        Distribute multiple calls of the function as a single job, or add them
+        to the current `JobBundling`. The arguments of all calls are checked
+        before anything is distributed.
+        `f.distribute_many([(("hello",), {}), ((), {"foobar": "bye"})])`
+        :param calls: The positional and keyword arguments of every call.
+        :return: The job reference.
+        """
+        signature = _get_signature(self.func)
+        funcs = []
+        for args, kwargs in calls:
+            signature.bind(*args, **kwargs)
+            funcs.append(FunctionCall(self.func_id, tuple(args), kwargs))
+        if not funcs:
+            msg = "No calls to distribute."
+            raise ValueError(msg)
+        guard_recursive_distribution()
+        return dispatch(
+            funcs,
+            self.special_slurm_opts,
+            entry_point=self.get_entry_point(),
+            block=False,
+        )
+
     def distribute_and_wait(self, *args, **kwargs) -> JobReference:
         """
         Distribute the function and wait for it to finish.
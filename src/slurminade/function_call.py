@@ -1,22 +1,82 @@
+import json
+import sys
 import typing
 
+try:
+    import orjson  # optional, faster parsing
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj: typing.Any) -> str:
+    """
+    Serialize to compact JSON with the json module. orjson is not used here, as it
+    also serializes, e.g., UUIDs and enums and turns NaN and infinity into null,
+    where the json module fails or keeps the value.
+    """
+    return json.dumps(obj, separators=(",", ":"))
+
+
+# orjson parses integers beyond 64 bits as floats. Payloads with such long
+# numbers (or false positives, e.g., in strings) are left to the json module.
+# Mapping all digits to "0" and searching for a run is far cheaper than a regex.
+_DIGITS_TO_ZERO = bytes(
+    ord("0") if chr(i) in "0123456789" else ord(" ") for i in range(256)
+)
+_LONG_NUMBER = b"0" * 19
+
+
+def _loads(data: typing.Union[str, bytes]) -> typing.Any:
+    """
+    Parse JSON, using orjson if available. Falls back to the json module for
+    data orjson rejects or would change, e.g., NaN or integers beyond 64 bits.
+    """
+    if orjson is not None:
+        if isinstance(data, str):
+            data = data.encode()
+        if data.translate(_DIGITS_TO_ZERO).find(_LONG_NUMBER) == -1:
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                pass
+    return json.loads(data)
+
 
 class FunctionCall:
     """
     A function call to be dispatched.
     """
 
+    __slots__ = ("func_id", "args", "kwargs", "_json_string")
+
     def __init__(self, func_id: str, args: typing.Tuple, kwargs: typing.Dict):
-        self.func_id = func_id  # the function id, as in FunctionMap
+        self.func_id = sys.intern(func_id)  # the function id, as in FunctionMap
         self.args = args  # the positional arguments for the call
         self.kwargs = kwargs  # the keyword arguments for the call
+        self._json_string: typing.Optional[str] = None  # cached serialization
 
     def to_json(self) -> typing.Dict:
         """
         Convert call to a json object that can be passed to slurm.
+        Empty arguments are omitted, as most calls of a bundle only use one kind.
         :return: json object.
         """
-        return {"func_id": self.func_id, "args": self.args, "kwargs": self.kwargs}
+        json_obj: typing.Dict[str, typing.Any] = {"func_id": self.func_id}
+        if self.args:
+            json_obj["args"] = self.args
+        if self.kwargs:
+            json_obj["kwargs"] = self.kwargs
+        return json_obj
+
+    def to_json_string(self) -> str:
+        """
+        Serialize the call to a compact JSON string. The result is cached, as the
+        arguments of a call are not supposed to change after its creation.
+        :return: The serialized call.
+        """
+        if self._json_string is None:
+            self._json_string = _dumps(self.to_json())
+        return self._json_string
 
     def __str__(self) -> str:
         """
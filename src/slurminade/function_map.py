@@ -3,9 +3,11 @@ The internal datastructure to save all the slurmified functions.
 Not relevant for endusers.
 """
 
+import functools
 import inspect
 import logging
 import pathlib
+import sys
 import typing
 from pathlib import Path
 from typing import Optional
@@ -13,6 +15,12 @@ from typing import Optional
 from .execute_cmds import call_slurminade_to_get_function_ids
 
 
+@functools.lru_cache(maxsize=128)
+def _resolve_file(file: str) -> Path:
+    # All functions of a file share the resolution, which follows symlinks.
+    return Path(file).resolve()
+
+
 class FunctionMap:
     """
     The function map assigns functions an id and stores them to be called later.
@@ -24,44 +32,54 @@ class FunctionMap:
     # The slurm node just executes the file content of a script, so the file name is lost.
     # slurminade will set this value in the beginning to reconstruct it.
     entry_point: typing.Optional[str] = None
+    # The validated path of the entry point, to avoid checking it on every call.
+    _entry_point_path: typing.Optional[Path] = None
+    # The entry point as passed to `set_entry_point`, often a relative `__file__`,
+    # together with the working directory it is relative to.
+    _entry_point_arg: typing.Optional[typing.Tuple[str, str]] = None
     _data: typing.ClassVar[typing.Dict[str, typing.Callable]] = {}
     _ids: typing.ClassVar[Optional[typing.Set[str]]] = set()
 
     @staticmethod
-    def get_id(func: typing.Callable) -> str:
+    def get_id(func: typing.Callable, file: typing.Optional[str] = None) -> str:
         """
         Returns the unique id of a function. Necessary to slurmify it.
         Probably not needed by the enduser.
         It uses the function name and its file, which should be sufficient unless you
         do not overwrite a function (which is bad anyway).
         :param func: The function you want the id of.
+        :param file: The file of the function, if already known.
         :return: The id as string.
         """
-        file = inspect.getfile(func)
+        if file is None:
+            file = inspect.getfile(func)
         if file == "<string>":  # on the slurm node, the functions in the entry point
             # are named `<string>`.
             if not FunctionMap.entry_point:
                 msg = "No entry point known."
                 raise RuntimeError(msg)
             file = FunctionMap.entry_point
-        path = Path(file).resolve()
-        return f"{path}:{func.__name__}"
+        # Made absolute first, as relative paths depend on the working directory.
+        path = _resolve_file(str(Path(file).absolute()))
+        # Interned, as the id is shared by all calls of the function.
+        return sys.intern(f"{path}:{func.__name__}")
 
     @staticmethod
     def get_readable_name(func_id: str) -> str:
         return func_id.split(":")[-1]
 
     @staticmethod
-    def check_compatibility(func: typing.Callable):
+    def check_compatibility(func: typing.Callable, file: typing.Optional[str] = None):
         """
         Throw if the function cannot be assigned an id.
         :param func: The function to be checked.
+        :param file: The file of the function, if already known.
         :return: None
         """
         if (
             not func.__name__
             or func.__name__ == "<lambda>"
-            or not inspect.getfile(func)
+            or not (file if file is not None else inspect.getfile(func))
         ):
             msg = "Can only slurmify proper functions."
             raise ValueError(msg)
@@ -73,8 +91,9 @@ class FunctionMap:
         :param func: The function to be stored. Needs to be a proper function.
         :return: The function's id.
         """
-        FunctionMap.check_compatibility(func)
-        func_id = FunctionMap.get_id(func)
+        file = inspect.getfile(func)  # only looked up once
+        FunctionMap.check_compatibility(func, file)
+        func_id = FunctionMap.get_id(func, file)
         if func_id in FunctionMap._data and not allow_overwrite:
             msg = "Multiple function definitions!"
             raise RuntimeError(msg)
@@ -96,10 +115,11 @@ class FunctionMap:
         :param kwargs: The keyword arguments.
         :return: The return value of the function.
         """
-        if func_id not in FunctionMap._data:
+        func = FunctionMap._data.get(func_id)
+        if func is None:
             msg = f"Function '{func_id}' unknown!"
             raise KeyError(msg)
-        return FunctionMap._data[func_id](*args, **kwargs)
+        return func(*args, **kwargs)
 
     @staticmethod
     def check_id(func_id: str, entry_point: Path) -> bool:
@@ -138,12 +158,21 @@ def set_entry_point(entry_point: typing.Union[str, pathlib.Path]) -> None:
     :param entry_point: A path to the entry point file.
     :return: None
     """
+    entry_point_arg = (str(Path.cwd()), str(entry_point))
+    if FunctionMap.entry_point is not None and (
+        entry_point_arg[1] == FunctionMap.entry_point
+        or entry_point_arg == FunctionMap._entry_point_arg
+    ):
+        return  # already set and checked
     entry_point = Path(entry_point)
-    if not entry_point.is_file() or not str(entry_point).endswith(".py"):
+    # The suffix is checked first, as it needs no file system access.
+    if entry_point.suffix != ".py" or not entry_point.is_file():
         msg = f"Illegal entry point ({entry_point})."
         raise ValueError(msg)
     entry_point = entry_point.resolve()
     FunctionMap.entry_point = str(entry_point)
+    FunctionMap._entry_point_path = entry_point
+    FunctionMap._entry_point_arg = entry_point_arg
     # SlurmFunction.dispatcher.entry_point = entry_point
 
 
@@ -163,8 +192,11 @@ def get_entry_point() -> Path:
 
         set_entry_point(entry_point)
     assert FunctionMap.entry_point is not None
-    path = Path(FunctionMap.entry_point)
-    if not path.exists():
-        msg = f"Entry point {path} does not exist."
-        raise FileNotFoundError(msg)
+    path = FunctionMap._entry_point_path
+    if path is None or str(path) != FunctionMap.entry_point:
+        path = Path(FunctionMap.entry_point)
+        if not path.exists():
+            msg = f"Entry point {path} does not exist."
+            raise FileNotFoundError(msg)
+        FunctionMap._entry_point_path = path
     return path
@@ -12,6 +12,7 @@ You can disable these security mechanisms by
 """
 
 import logging
+import threading
 import typing
 
 _exec_flag = False
@@ -23,7 +24,8 @@ def on_slurm_node():
 
 
 def guard_recursive_distribution():
-    if on_slurm_node():
+    # Reads the flag directly, as this is checked for every distribution.
+    if _exec_flag:
         msg = """
         You tried to distribute a task recursively. This is not allowed by default,
         because it probably indicates a bug in your code. To save you from accidentally
@@ -67,14 +69,20 @@ class _DispatchGuard:
     def __init__(self, max_calls):
         self.max_calls = max_calls
         self.remaining_calls = max_calls
+        self._lock = threading.Lock()  # bundles may be submitted concurrently
 
-    def __call__(self):
+    def __call__(self, n: int = 1):
+        """
+        Charge a submission creating `n` jobs, e.g., a job array with `n` tasks.
+        The submission is only allowed if all its jobs fit into the limit.
+        """
         if not self.max_calls:
             return None
-        if self.remaining_calls <= 0:
-            raise TooManyDispatchesError(self.max_calls)
-        self.remaining_calls -= 1
-        return self.remaining_calls
+        with self._lock:
+            if self.remaining_calls < n:
+                raise TooManyDispatchesError(self.max_calls)
+            self.remaining_calls -= n
+            return self.remaining_calls
 
     def set_limit(self, n):
         self.max_calls = n
@@ -88,6 +96,8 @@ def set_dispatch_limit(n: typing.Optional[int]):
     """
     Set a limit to the number of dispatches. This feature has been introduced to
     prevent you from accidentally DDoSing you Slurm environment due to a bug.
+    Every job counts as one dispatch, including every task of a job array, no
+    matter how many function calls are bundled into it.
     :param n: The maximal number of dispatches.
     :return: None
     """
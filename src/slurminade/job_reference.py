@@ -12,6 +12,9 @@ class JobReference(abc.ABC):
     as needed.
     """
 
+    # A reference is created for every dispatch.
+    __slots__ = ()
+
     @abc.abstractmethod
     def get_job_id(self) -> Optional[int]:
         pass
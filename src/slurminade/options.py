@@ -8,6 +8,45 @@ class SlurmOptions(dict):
     same options can be bundled.
     """
 
+    # No __dict__ next to the dict itself, as an instance is created per dispatch.
+    __slots__ = ("_hash",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._hash = None  # cached, reset on every modification
+
+    def __reduce__(self):
+        # The cached hash is not pickled, as string hashes differ between processes.
+        return self.__class__, (dict(self),)
+
+    def __setitem__(self, key, value):
+        self._hash = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._hash = None
+        super().__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        self._hash = None
+        super().update(*args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        self._hash = None
+        return super().setdefault(key, default)
+
+    def pop(self, *args):
+        self._hash = None
+        return super().pop(*args)
+
+    def popitem(self):
+        self._hash = None
+        return super().popitem()
+
+    def clear(self):
+        self._hash = None
+        super().clear()
+
     def _items(self):
         for k, v in self.items():
             if isinstance(v, dict):
@@ -16,33 +55,43 @@ class SlurmOptions(dict):
                 yield k, v
 
     def __hash__(self):
-        return hash(tuple(sorted(hash((k, v)) for k, v in self._items())))
+        if self._hash is None:
+            self._hash = hash(frozenset(self._items()))
+        return self._hash
 
     def __eq__(self, other):
         if not isinstance(other, SlurmOptions):
             return False
-        return hash(self) == hash(other)
+        # Different (cached) hashes rule out equality, equal hashes do not imply it.
+        try:
+            if hash(self) != hash(other):
+                return False
+        except TypeError:  # unhashable values, e.g., lists
+            pass
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
 
     def as_dict(self) -> typing.Dict:
         return dict(self._items())
 
     def add_dependencies(self, job_ids, method: str = "afterany"):
-        opt = f"{method}:" + ":".join(str(jid) for jid in job_ids)
-        if "dependency" in self:
-            # There are already dependencies. Trying to extend them.
-            if isinstance(self["dependency"], dict):
-                dependecy_dict = self["dependency"]
-                if method in dependecy_dict:
-                    dependecy_dict[method] += ":" + ":".join(
-                        str(jid) for jid in job_ids
-                    )
-                else:
-                    dependecy_dict[method] = ":".join(str(jid) for jid in job_ids)
-            elif isinstance(self["dependency"], str):
-                self["dependency"] += "," + opt
+        job_ids = ":".join(map(str, job_ids))
+        dependency = self.get("dependency")
+        if dependency is None:
+            self["dependency"] = f"{method}:{job_ids}"
+        elif isinstance(dependency, dict):
+            # Copied, as the options may be a copy sharing the dict with the original.
+            dependency = dict(dependency)
+            if method in dependency:
+                dependency[method] += ":" + job_ids
             else:
-                # Could not extend dependencies because I have no idea what is going on.
-                msg = "Key 'dependency' has unexpected type."
-                raise RuntimeError(msg)
+                dependency[method] = job_ids
+            self["dependency"] = dependency
+        elif isinstance(dependency, str):
+            self["dependency"] = f"{dependency},{method}:{job_ids}"
         else:
-            self["dependency"] = opt
+            # Could not extend dependencies because I have no idea what is going on.
+            msg = "Key 'dependency' has unexpected type."
+            raise RuntimeError(msg)
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+import pytest
+
+FAKE_SBATCH = """#!/bin/sh
+script=$(mktemp)
+cat > "$script"
+if [ {exit_code} -eq 0 ]; then
+    bash "$script" >&2
+    echo "{output}"
+else
+    echo "{output}" >&2
+fi
+rm "$script"
+exit {exit_code}
+"""
+
+
+@pytest.fixture()
+def fake_sbatch(tmp_path):
+    """
+    Creates a fake `sbatch` in a directory of its own. If successful, it directly
+    runs the script it reads from stdin and prints `output` like the job id of
+    `sbatch --parsable`. Otherwise, it only prints `output` as error.
+    """
+
+    def create(output: str = "42", exit_code: int = 0) -> Path:
+        (tmp_path / "bin").mkdir(exist_ok=True)
+        sbatch = tmp_path / "bin" / "sbatch"
+        sbatch.write_text(FAKE_SBATCH.format(output=output, exit_code=exit_code))
+        sbatch.chmod(0o755)
+        return sbatch
+
+    return create
@@ -0,0 +1,54 @@
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+
+import slurminade
+from slurminade import dispatcher
+from slurminade.execute_cmds import create_slurminade_array_command
+from slurminade.function_call import FunctionCall
+from slurminade.options import SlurmOptions
+
+
+@slurminade.slurmify()
+def f(path, s):
+    with Path(path).open("w") as file:
+        file.write(s)
+
+
+def test_array_command():
+    slurminade.set_entry_point(__file__)
+    files = [Path(f"./f_test_file_{i}.txt") for i in range(3)]
+    bundles = [
+        [FunctionCall(f.func_id, (str(files[0]), "a"), {})],
+        [
+            FunctionCall(f.func_id, (str(files[1]), "b"), {}),
+            FunctionCall(f.func_id, (), {"path": str(files[2]), "s": "c"}),
+        ],
+    ]
+    command = create_slurminade_array_command(Path(__file__), bundles)
+    for i in range(len(bundles)):
+        env = dict(os.environ, SLURM_ARRAY_TASK_ID=str(i))
+        subprocess.run(command, shell=True, check=True, env=env)
+    for file, s in zip(files, ["a", "b", "c"]):
+        assert file.is_file()
+        with file.open() as f_:
+            assert f_.readline() == s
+        file.unlink()
+    prefix = Path(command.split()[-1])
+    assert not list(prefix.parent.glob(prefix.name + "_*.json"))
+
+
+def test_failed_array_submission(monkeypatch, tmp_path, fake_sbatch):
+    sbatch = fake_sbatch("failed", exit_code=1)
+    monkeypatch.setattr(dispatcher, "_which_sbatch", lambda: str(sbatch))
+    monkeypatch.chdir(tmp_path)
+    slurminade.set_entry_point(__file__)
+    slurminade.set_dispatch_limit(100)
+    bundles = [[FunctionCall(f.func_id, ("x", str(i)), {})] for i in range(3)]
+    with pytest.raises(RuntimeError):
+        dispatcher.SlurmDispatcher().dispatch_bundles(
+            bundles, SlurmOptions(), Path(__file__)
+        )
+    assert not list(tmp_path.glob("*.json"))
@@ -0,0 +1,172 @@
+import gc
+import os
+import subprocess
+import sys
+import weakref
+
+import pytest
+
+import slurminade
+
+
+@slurminade.slurmify()
+def f(x):  # noqa: ARG001
+    pass
+
+
+def test_bundling_deduplicate():
+    slurminade.set_entry_point(__file__)
+    slurminade.set_dispatch_limit(100)
+    dispatcher = slurminade.TestDispatcher()
+    slurminade.set_dispatcher(dispatcher)
+    with slurminade.JobBundling(max_size=10, deduplicate=True):
+        f.distribute(1)
+        f.distribute(2)
+        f.distribute(1)
+        f.distribute(x=1)
+    assert len(dispatcher.calls) == 1
+    assert [call.args for call in dispatcher.calls[0]] == [(1,), (2,), ()]
+
+
+@slurminade.slurmify(partition="other")
+def g(x):  # noqa: ARG001
+    pass
+
+
+def test_bundling_groups_by_options():
+    slurminade.set_entry_point(__file__)
+    slurminade.set_dispatch_limit(100)
+    dispatcher = slurminade.TestDispatcher()
+    slurminade.set_dispatcher(dispatcher)
+    with slurminade.JobBundling(max_size=10):
+        f.distribute(1)
+        f.distribute(2)
+        g.distribute(3)
+        f.with_options(partition="other").distribute(4)
+        f.distribute(5)
+    assert [[call.args for call in calls] for calls in dispatcher.calls] == [
+        [(1,), (2,), (5,)],
+        [(3,), (4,)],
+    ]
+
+
+def test_bundling_equal_options():
+    slurminade.set_entry_point(__file__)
+    slurminade.set_dispatch_limit(100)
+    dispatcher = slurminade.TestDispatcher()
+    slurminade.set_dispatcher(dispatcher)
+    with slurminade.JobBundling(max_size=10):
+        for i in range(3):
+            f.with_options(partition="other").distribute(i)
+        g.distribute(3)
+    assert [[call.args for call in calls] for calls in dispatcher.calls] == [
+        [(0,), (1,), (2,), (3,)]
+    ]
+
+
+def test_bundling_add():
+    slurminade.set_entry_point(__file__)
+    slurminade.set_dispatch_limit(100)
+    dispatcher = slurminade.TestDispatcher()
+    slurminade.set_dispatcher(dispatcher)
+    with slurminade.JobBundling(max_size=10) as batch:
+        batch.add(f, 1)
+        f.distribute(2)
+        batch.add(g, x=3)
+    assert [[call.args for call in calls] for calls in dispatcher.calls] == [
+        [(1,), (2,)],
+        [()],
+    ]
+    assert dispatcher.calls[1][0].kwargs == {"x": 3}
+
+
+def test_distribute_many():
+    slurminade.set_entry_point(__file__)
+    slurminade.set_dispatch_limit(100)
+    dispatcher = slurminade.TestDispatcher()
+    slurminade.set_dispatcher(dispatcher)
+    with pytest.raises(TypeError):
+        f.distribute_many([((1,), {}), ((1, 2), {})])
+    assert dispatcher.calls == []
+    f.distribute_many([((1,), {}), ([2], {}), ((), {"x": 3})])
+    assert [[call.args for call in calls] for calls in dispatcher.calls] == [
+        [(1,), (2,), ()]
+    ]
+    with slurminade.JobBundling(max_size=2):
+        f.distribute_many(((i,), {}) for i in range(3))
+    assert len(dispatcher.calls) == 3
+
+
+@slurminade.slurmify()
+def h(x, y=1, *, z=2):  # noqa: ARG001
+    pass
+
+
+def test_check_arguments():
+    for func in (f, h):
+        func._check((1,), {})
+        func._check((), {"x": 1})
+        with pytest.raises(TypeError):
+            func._check((), {})
+        with pytest.raises(TypeError):
+            func._check((1, 2, 3), {})
+    h._check((1, 2), {"z": 3})
+
+
+# A script that leaves a bundling unflushed, to be flushed at exit.
+EXIT_FLUSH_SCRIPT = """
+import sys
+from pathlib import Path
+
+import slurminade
+from slurminade.dispatcher import DirectCallDispatcher, SlurmDispatcher
+
+
+@slurminade.slurmify()
+def f(path):
+    Path(path).write_text("done")
+
+
+if __name__ == "__main__":
+    slurminade.set_dispatcher({dispatcher})
+    slurminade.set_dispatcher(slurminade.JobBundling(max_size=10))
+    f.distribute(sys.argv[1] + "/a.txt")
+    f.with_options(partition="other").distribute(sys.argv[1] + "/b.txt")
+"""
+
+
+@pytest.mark.parametrize(
+    "dispatcher",
+    [
+        "DirectCallDispatcher()",
+        "SlurmDispatcher()",
+        "SlurmDispatcher(asynchronous=True)",
+    ],
+)
+def test_flush_at_exit(tmp_path, fake_sbatch, dispatcher):
+    sbatch = fake_sbatch()
+    env = dict(os.environ, PATH=f"{sbatch.parent}{os.pathsep}{os.environ['PATH']}")
+    script = tmp_path / "script.py"
+    script.write_text(EXIT_FLUSH_SCRIPT.format(dispatcher=dispatcher))
+    subprocess.run([sys.executable, str(script), str(tmp_path)], check=True, env=env)
+    assert (tmp_path / "a.txt").read_text() == "done"
+    assert (tmp_path / "b.txt").read_text() == "done"
+
+
+def test_unflushed_bundling_is_collectable(caplog):
+    slurminade.set_entry_point(__file__)
+    dispatcher = slurminade.TestDispatcher()
+    slurminade.set_dispatcher(dispatcher)
+    flushed = slurminade.JobBundling(max_size=10)
+    flushed.add(f, 1)
+    flushed.flush()
+    unflushed = slurminade.JobBundling(max_size=10)
+    unflushed.add(f, 2)
+    unflushed.add(f, 3)
+    bundlings = [weakref.ref(flushed), weakref.ref(unflushed)]
+    del flushed, unflushed
+    gc.collect()
+    assert [bundling() for bundling in bundlings] == [None, None]
+    assert len(dispatcher.calls) == 1
+    assert caplog.text.count("garbage collected") == 1
+    assert "Its 2 buffered tasks have not been distributed" in caplog.text
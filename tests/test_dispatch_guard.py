@@ -19,6 +19,14 @@ def test_dispatch_guard_simple():
         dg()
 
 
+def test_dispatch_guard_multiple_jobs():
+    dg = _DispatchGuard(3)
+    dg(2)
+    with pytest.raises(TooManyDispatchesError):
+        dg(2)
+    dg(1)
+
+
 def test_dispatch_guard_dispatch_limit():
     slurminade.set_entry_point(__file__)
     set_dispatch_limit(3)
@@ -0,0 +1,22 @@
+import pytest
+
+import slurminade
+from slurminade.function_map import FunctionMap, get_entry_point
+
+
+def test_set_relative_entry_point(monkeypatch, tmp_path):
+    for attr in ("entry_point", "_entry_point_path", "_entry_point_arg"):
+        monkeypatch.setattr(FunctionMap, attr, getattr(FunctionMap, attr))
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "main.py").write_text("")
+    monkeypatch.chdir(tmp_path / "a")
+    slurminade.set_entry_point("main.py")
+    assert get_entry_point() == (tmp_path / "a" / "main.py").resolve()
+    monkeypatch.chdir(tmp_path / "b")
+    slurminade.set_entry_point("main.py")
+    assert get_entry_point() == (tmp_path / "b" / "main.py").resolve()
+    (tmp_path / "a" / "main.py").unlink()
+    monkeypatch.chdir(tmp_path / "a")
+    with pytest.raises(ValueError, match="Illegal entry point"):
+        slurminade.set_entry_point("main.py")
@@ -0,0 +1,78 @@
+import dataclasses
+import datetime
+import io
+import json
+import uuid
+from enum import Enum, IntEnum
+
+import pytest
+
+from slurminade import function_call
+from slurminade.execute_cmds import _serialize_calls, _write_calls
+from slurminade.function_call import FunctionCall, _loads
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: int
+
+
+def test_serialize_calls_round_trip():
+    calls = [
+        FunctionCall("file.py:f", (1, "a'b", [1.5, None]), {"x": {"y": True}}),
+        FunctionCall("file.py:g", (), {}),
+    ]
+    serialized = _serialize_calls(calls)
+    assert json.loads(serialized) == json.loads(
+        json.dumps([call.to_json() for call in calls])
+    )
+    assert calls[0].to_json_string() is calls[0].to_json_string()
+    assert json.loads(calls[1].to_json_string()) == {"func_id": "file.py:g"}
+    assert _serialize_calls([]) == "[]"
+    file = io.StringIO()
+    _write_calls(file, calls)
+    assert [json.loads(line) for line in file.getvalue().splitlines()] == json.loads(
+        serialized
+    )
+
+
+def test_serialize_special_values():
+    # Every special value in a call of its own, so none hides another one.
+    for arg, expected in [
+        ("ä", "ä"),
+        (2**70, 2**70),
+        ({1: "a"}, {"1": "a"}),
+        (float("inf"), float("inf")),
+        (IntEnum("E", "A")(1), 1),
+    ]:
+        call = FunctionCall("file.py:f", (arg,), {})
+        assert call.to_json_string().isascii()
+        assert json.loads(call.to_json_string())["args"] == [expected]
+    call = FunctionCall("file.py:f", (float("nan"),), {})
+    assert call.to_json_string() == '{"func_id":"file.py:f","args":[NaN]}'
+    for arg in [
+        datetime.datetime(2024, 1, 1),
+        uuid.UUID(int=1),
+        Enum("E", "A")(1),
+        Point(1, 2),
+    ]:
+        with pytest.raises(TypeError):
+            FunctionCall("file.py:f", (arg,), {}).to_json_string()
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_loads(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(function_call, "orjson", None)
+    call = FunctionCall("file.py:f", ("ä", 2**70, 1.5), {"x": float("inf")})
+    for data in (call.to_json_string(), call.to_json_string().encode()):
+        assert _loads(data) == {
+            "func_id": "file.py:f",
+            "args": ["ä", 2**70, 1.5],
+            "kwargs": {"x": float("inf")},
+        }
+    # Integers around the 64 bit limits, each in a call of its own.
+    for arg in [2**64 - 1, 2**64, -(2**63), -(2**63) - 1, "1" * 25, 10**18]:
+        call = FunctionCall("file.py:f", (arg,), {})
+        assert _loads(call.to_json_string())["args"] == [arg]
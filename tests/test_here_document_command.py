@@ -0,0 +1,42 @@
+import subprocess
+from pathlib import Path
+
+import slurminade
+from slurminade import dispatcher
+from slurminade.execute_cmds import create_slurminade_here_document_command
+from slurminade.function_call import FunctionCall
+from slurminade.options import SlurmOptions
+
+TEXT = "$HOME `pwd` \\ \"a\" 'b'\nSLURMINADE_CALLS"
+
+
+@slurminade.slurmify()
+def f(path, s):
+    with Path(path).open("w") as file:
+        file.write(s)
+
+
+def test_here_document_command():
+    slurminade.set_entry_point(__file__)
+    file = Path("./f_test_file_here_document.txt")
+    funcs = [FunctionCall(f.func_id, (str(file), TEXT), {})]
+    assert create_slurminade_here_document_command(Path(__file__), funcs, 10000) is None
+    command = create_slurminade_here_document_command(Path(__file__), funcs, 10)
+    subprocess.run(command, shell=True, check=True)
+    assert file.read_text() == TEXT
+    file.unlink()
+
+
+def test_sbatch_from_stdin(monkeypatch, fake_sbatch):
+    sbatch = fake_sbatch("42;c")
+    monkeypatch.setattr(dispatcher, "_which_sbatch", lambda: str(sbatch))
+    slurminade.set_entry_point(__file__)
+    slurminade.set_dispatch_limit(100)
+    file = Path("./f_test_file_sbatch_from_stdin.txt")
+    slurm_dispatcher = dispatcher.SlurmDispatcher()
+    slurm_dispatcher.max_arg_length = 10
+    funcs = [FunctionCall(f.func_id, (str(file), TEXT), {})]
+    job_ref = slurm_dispatcher(funcs, SlurmOptions(), Path(__file__))
+    assert job_ref.get_job_id() == 42
+    assert file.read_text() == TEXT
+    file.unlink()
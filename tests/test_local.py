@@ -1,6 +1,10 @@
+import subprocess
 from pathlib import Path
 
+import pytest
+
 import slurminade
+from slurminade.dispatcher import DirectCallDispatcher
 from slurminade.function import SlurmFunction
 
 f_file = "./f_test_file.txt"
@@ -42,3 +46,14 @@ def test_local_2():
     with Path(g_file).open() as file:
         assert file.readline() == "a:2"
     delete_g()
+
+
+def test_local_srun():
+    slurminade.set_dispatch_limit(100)
+    delete_f()
+    DirectCallDispatcher().srun(f"echo 'a b' > {f_file}")
+    with Path(f_file).open() as file:
+        assert file.readline() == "a b\n"
+    delete_f()
+    with pytest.raises(subprocess.CalledProcessError):
+        DirectCallDispatcher().sbatch("exit 3")
@@ -0,0 +1,47 @@
+import copy
+import pickle
+
+from slurminade.options import SlurmOptions
+
+
+def test_add_dependencies():
+    options = SlurmOptions()
+    options.add_dependencies(iter([1, 2]))
+    assert options["dependency"] == "afterany:1:2"
+    options.add_dependencies([3], "afterok")
+    assert options["dependency"] == "afterany:1:2,afterok:3"
+
+
+def test_add_dependencies_to_dict():
+    original = SlurmOptions(dependency={"afterany": "1"})
+    options = SlurmOptions(**original)
+    options.add_dependencies(iter([2, 3]))
+    options.add_dependencies([4], "afterok")
+    assert options["dependency"] == {"afterany": "1:2:3", "afterok": "4"}
+    assert original["dependency"] == {"afterany": "1"}
+    assert hash(options) != hash(original)
+
+
+def test_equality():
+    assert SlurmOptions(a=1, b={"c": 2}) == SlurmOptions(b={"c": 2}, a=1)
+    assert SlurmOptions(a=1) != SlurmOptions(a=2)
+    assert SlurmOptions(a=[1]) == SlurmOptions(a=[1])
+    assert SlurmOptions(a=[1]) != SlurmOptions(a=[2])
+    assert SlurmOptions(a=1) != {"a": 1}
+
+
+def test_equality_with_hash_collision(monkeypatch):
+    monkeypatch.setattr(SlurmOptions, "__hash__", lambda _: 0)
+    assert SlurmOptions(a=1) != SlurmOptions(a=2)
+
+
+def test_pickle_drops_cached_hash():
+    options = SlurmOptions(partition="a", dependency={"afterany": "1"})
+    hash(options)
+    options._hash = 0  # as if hashed in a process with another hash seed
+    for restored in (pickle.loads(pickle.dumps(options)), copy.deepcopy(options)):
+        assert type(restored) is SlurmOptions
+        assert restored == SlurmOptions(partition="a", dependency={"afterany": "1"})
+        assert {SlurmOptions(partition="a", dependency={"afterany": "1"}): 1}[
+            restored
+        ] == 1
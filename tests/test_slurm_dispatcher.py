@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import slurminade
+from slurminade import dispatcher
+from slurminade.function_call import FunctionCall
+from slurminade.options import SlurmOptions
+
+
+@slurminade.slurmify()
+def f(x):  # noqa: ARG001
+    pass
+
+
+def test_slurm_api_cache(monkeypatch):
+    monkeypatch.setattr(dispatcher, "_is_slurm_available", lambda: True)
+    slurm_dispatcher = dispatcher.SlurmDispatcher()
+    slurm_1 = slurm_dispatcher._create_slurm_api(SlurmOptions(partition="a"))
+    slurm_1.add_cmd("echo 1")
+    slurm_2 = slurm_dispatcher._create_slurm_api(SlurmOptions(partition="a"))
+    assert slurm_2.run_cmds == []
+    assert "--partition           a" in slurm_2.script()
+    slurm_3 = slurm_dispatcher._create_slurm_api(SlurmOptions(partition="b"))
+    assert "--partition           b" in slurm_3.script()
+    assert len(slurm_dispatcher._slurm_api_cache) == 2
+
+
+def test_asynchronous_sbatch(monkeypatch):
+    monkeypatch.setattr(dispatcher, "_is_slurm_available", lambda: True)
+    monkeypatch.setattr(
+        dispatcher.simple_slurm.Slurm,
+        "sbatch",
+        lambda self, command: len([*self.run_cmds, command]) + 41,
+    )
+    slurm_dispatcher = dispatcher.SlurmDispatcher(asynchronous=True)
+    job_ref = slurm_dispatcher.sbatch("echo 1", SlurmOptions())
+    assert isinstance(job_ref, dispatcher.AsyncSlurmJobReference)
+    assert job_ref.get_job_id() == 42
+    slurm_dispatcher.join()
+    assert slurm_dispatcher._join_dependencies == [42]
+
+
+def test_max_array_size(monkeypatch, tmp_path):
+    monkeypatch.setattr(dispatcher, "_is_slurm_available", lambda: True)
+    scripts = []
+
+    def sbatch(slurm, command):
+        slurm.add_cmd(command)
+        scripts.append(slurm.script(convert=False))
+        return 41 + len(scripts)
+
+    monkeypatch.setattr(dispatcher, "_sbatch_from_stdin", sbatch)
+    monkeypatch.chdir(tmp_path)
+    slurminade.set_entry_point(__file__)
+    slurminade.set_dispatch_limit(100)
+    slurm_dispatcher = dispatcher.SlurmDispatcher(max_array_size=2)
+    bundles = [[FunctionCall(f.func_id, (i,), {})] for i in range(5)]
+    job_refs = slurm_dispatcher.dispatch_bundles(
+        bundles, SlurmOptions(), Path(__file__)
+    )
+    assert [job_ref.get_job_id() for job_ref in job_refs] == [42, 43, 44]
+    assert ["--array" in script for script in scripts] == [True, True, True]
+    assert "0-1" in scripts[0]
+    assert "0-0" in scripts[2]
+    assert len(list(tmp_path.glob("slurminade_*.json"))) == 5
@@ -0,0 +1,50 @@
+import os
+from pathlib import Path
+
+import slurminade
+
+g_file = "./g_worker_test_file.txt"
+
+
+@slurminade.slurmify()
+def g(x, y):
+    with Path(g_file).open("a") as file:
+        file.write(f"{x}:{y}\n")
+
+
+def test_subprocess_worker():
+    Path(g_file).unlink(missing_ok=True)
+    dispatcher = slurminade.SubprocessDispatcher(persistent_worker=True)
+    slurminade.set_dispatcher(dispatcher)
+    slurminade.set_entry_point(__file__)
+    slurminade.set_dispatch_limit(100)
+    g.distribute(x="a", y=1)
+    g.distribute("b", 2)
+    assert len(dispatcher._workers) == 1
+    with Path(g_file).open() as file:
+        assert file.readlines() == ["a:1\n", "b:2\n"]
+    dispatcher.close()
+    Path(g_file).unlink()
+
+
+@slurminade.slurmify()
+def crash():
+    os._exit(3)
+
+
+def test_subprocess_worker_restarts_after_crash(caplog):
+    Path(g_file).unlink(missing_ok=True)
+    dispatcher = slurminade.SubprocessDispatcher(persistent_worker=True)
+    slurminade.set_dispatcher(dispatcher)
+    slurminade.set_entry_point(__file__)
+    slurminade.set_dispatch_limit(100)
+    g.distribute("a", 1)
+    crash.distribute()
+    assert "Function calls failed with exit code 3." in caplog.text
+    assert dispatcher._workers == {}
+    g.distribute("b", 2)
+    assert len(dispatcher._workers) == 1
+    with Path(g_file).open() as file:
+        assert file.readlines() == ["a:1\n", "b:2\n"]
+    dispatcher.close()
+    Path(g_file).unlink()